@@ -1,24 +1,37 @@
+import asyncio
+import hashlib
 import logging
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+import os
+import threading
+import uuid
+from operator import itemgetter
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from cachetools import TTLCache
 from firebase_admin import auth as firebase_auth
+from google.api_core.exceptions import AlreadyExists
+from google.cloud import firestore
 from datetime import datetime
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, EmailStr, Field, field_validator
 
 # Models
-from app.models.tenant import ChatbotConfig, Tenant, ApprovalStatus
+from app.models.tenant import ChatbotConfig, ApprovalStatus
 from app.models.user import User
 
 # Core Services
-from app.api.v1.endpoints.auth import get_current_user
+from app.api.v1.endpoints.auth import get_current_user, invalidate_user_profile
+from app.api.v1.endpoints.demos import invalidate_demo_page
 from app.db.firestore import db
 from app.services.workflow import WorkflowService
 from app.core.rbac import check_permission, Action, UserRole
-from app.storage import upload_file_to_gcs
+from app.storage import MAX_UPLOAD_BYTES, UploadTooLarge, sniff_image_type, upload_file_to_gcs
 
 # New Services
-from app.services.audit import log_activity
-from app.services.notifications import notify_admins, notify_user_by_email
+from app.services.live_cache import MIRRORS, tenant_mirror
+from app.services.audit import build_audit_entry, log_activity
+from app.services.notifications import invalidate_admin_list, notify_admins, notify_user_by_email
 
 # Setup Logging
 logger = logging.getLogger("lumina.admin")
@@ -31,134 +44,372 @@ class RoleUpdate(BaseModel):
 class TenantAssignmentUpdate(BaseModel):
     assigned_tenants: List[str]
 
-# --- HELPER: GET CLEAN ASSIGNED IDS ---
-def get_clean_assigned_ids(user_doc_dict: dict) -> List[str]:
-    """Helper to safely extract and clean assigned tenant IDs."""
-    raw = user_doc_dict.get("assigned_tenants", [])
-    if isinstance(raw, str):
-        raw = raw.split(",")
-    return [str(item).strip() for item in raw if item and str(item).strip()]
+class TenantIdList(BaseModel):
+    tenant_ids: List[str]
+
+class CreateTenantPayload(BaseModel):
+    tenant_id: str
+    slug: str
+    client_name: str
+    bot_name: str = "My Bot"
+    primary_color: str = "#10B981"
+    welcome_message: str = "Hello!"
+    custom_js: str = ""
+    background_color: str = "#F9FAFB"
+    banner_urls: List[str] = []
+
+    @field_validator("banner_urls", mode="before")
+    @classmethod
+    def split_banner_lines(cls, value):
+        # The onboarding form may send banners as one newline-separated string
+        if isinstance(value, str):
+            return [url.strip() for url in value.split("\n") if url.strip()]
+        return value
+
+# Payload fields that become the tenant's initial live_config
+LIVE_CONFIG_FIELDS = frozenset(CreateTenantPayload.model_fields) & frozenset(ChatbotConfig.model_fields)
+
+class NewUser(BaseModel):
+    email: EmailStr
+    password: str
+    role: UserRole = UserRole.CONTRIBUTOR
+    assigned_tenants: List[str] = []
+
+# Firebase Auth accepts at most 1000 users per import_users() call
+AUTH_IMPORT_BATCH_SIZE = 1000
+
+class BulkUserOnboard(BaseModel):
+    # One import_users() call's worth; larger uploads are rejected with 422
+    users: List[NewUser] = Field(..., min_length=1, max_length=AUTH_IMPORT_BATCH_SIZE)
+
+# Firestore caps a WriteBatch at 500 writes
+WRITE_BATCH_LIMIT = 500
+PASSWORD_HASH_ROUNDS = 100_000
+
+# --- FIELD PROJECTIONS ---
+# List views only render a few columns; fetch just those instead of whole docs.
+TENANT_SUMMARY_FIELDS = ["tenant_id", "client_name", "slug", "approval_status", "live_config", "is_archived"]
+APPROVAL_FIELDS = ["tenant_id", "client_name", "slug", "last_modified_by", "pending_config"]
+USER_LIST_FIELDS = ["uid", "email", "role", "assigned_tenants", "is_active", "is_archived"]
+AUDIT_LOG_FIELDS = ["timestamp", "actor_email", "actor_role", "action", "target_id", "details"]
+
+# Firestore caps "in" filters at 30 values
+IN_QUERY_LIMIT = 30
+
+# --- REVIEW QUEUES ---
+# Which approval_status each reviewing role works from. Queue queries pair it
+# with is_archived, served by the composite index in firestore.indexes.json.
+ROLE_TO_STATUS = {
+    UserRole.ADMIN.value: ApprovalStatus.PENDING_ADMIN,
+    UserRole.SUPER_ADMIN.value: ApprovalStatus.PENDING_SUPER_ADMIN,
+}
+VALID_ROLES = frozenset(r.value for r in UserRole)
+
+# --- HELPER: STREAMED JSON ARRAYS ---
+def _json_default(value):
+    # Firestore returns datetime subclasses, which orjson won't encode natively
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def _stream_json_page(query, limit: int, cursor_of):
+    """Streams one page of a cursor query as {"items": [...], "next_cursor": ...}.
+
+    The cursor is cursor_of(doc, row) for the last row; it is null once a page
+    comes back short, i.e. there is nothing left to read.
+    """
+    yield b'{"items":['
+    scanned = 0
+    last_seen = None
+    for doc in query.stream():
+        row = doc.to_dict()
+        last_seen = cursor_of(doc, row)
+        yield (b"," if scanned else b"") + orjson.dumps(row, default=_json_default)
+        scanned += 1
+    next_cursor = last_seen if scanned == limit else None
+    yield b'],"next_cursor":' + orjson.dumps(next_cursor, default=_json_default) + b"}"
+
+# --- LIST CACHE ---
+# Admin dashboards poll the tenant/user lists; serve bursts from memory for a
+# few seconds. Bodies are filled from the threadpool, hence the lock.
+LIST_CACHE_TTL = 10
+_list_cache = TTLCache(maxsize=64, ttl=LIST_CACHE_TTL)
+_list_cache_lock = threading.Lock()
+# Bumped per kind on every invalidation; a stream that began before a write
+# must not store its (possibly pre-write) body after that write cleared the cache.
+_list_cache_generation = {"tenants": 0, "users": 0}
+
+def _tee_into_list_cache(key, chunks, generation: int):
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    with _list_cache_lock:
+        if _list_cache_generation[key[1]] == generation:
+            _list_cache[key] = b"".join(parts)
+
+def cached_json_body(key: tuple, chunks_factory):
+    """Serves a cached list body, or streams a fresh one and caches it on completion."""
+    with _list_cache_lock:
+        body = _list_cache.get(key)
+        generation = _list_cache_generation[key[1]]
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+    return StreamingResponse(_tee_into_list_cache(key, chunks_factory(), generation), media_type="application/json")
+
+def invalidate_list_cache(kind: str):
+    """Drops every cached list of the given kind ("tenants" or "users")."""
+    # The mirror may not have this write yet; don't let the refill cache pre-write data
+    MIRRORS[kind].mark_written()
+    with _list_cache_lock:
+        _list_cache_generation[kind] += 1
+        for key in [k for k in _list_cache.keys() if k[1] == kind]:
+            _list_cache.pop(key, None)
+
+# --- DASHBOARD CACHE ---
+# Stats and the review queue are fetched on every dashboard open but only move
+# when tenants or users change; those writes clear the whole cache.
+DASHBOARD_CACHE_TTL = 30
+# The dashboard re-fetches these right after its own writes, so browsers must
+# revalidate every time; the server-side cache is what absorbs the load.
+DASHBOARD_CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+_dashboard_cache = TTLCache(maxsize=1024, ttl=DASHBOARD_CACHE_TTL)
+
+def invalidate_dashboard_cache():
+    for mirror in MIRRORS.values():
+        mirror.mark_written()
+    _dashboard_cache.clear()
 
 # --- 1. AUDIT LOGS ---
 @router.get("/audit-logs")
-async def get_audit_logs(limit: int = 50, user: dict = Depends(get_current_user)):
+async def get_audit_logs(
+    limit: int = Query(50, ge=1, le=200),
+    after_ts: Optional[str] = Query(None, description="next_cursor.ts from the previous page"),
+    after_id: Optional[str] = Query(None, description="next_cursor.id from the previous page"),
+    user: dict = Depends(get_current_user)
+):
     if not check_permission(user["role"], Action.MANAGE_USERS):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    try:
-        docs = db.collection("audit_logs")\
-                 .order_by("timestamp", direction="DESCENDING")\
-                 .limit(limit)\
-                 .stream()
-        
-        logs = []
-        for doc in docs:
-            d = doc.to_dict()
-            if isinstance(d.get("timestamp"), datetime):
-                d["timestamp"] = d["timestamp"].isoformat()
-            logs.append(d)
-        return logs
-    except Exception as e:
-        logger.error(f"Audit fetch failed: {e}")
-        return []
+    # Document ID breaks timestamp ties (batched writes share a commit time)
+    logs_ref = db.collection("audit_logs")
+    query = logs_ref.select(AUDIT_LOG_FIELDS)\
+                    .order_by("timestamp", direction=firestore.Query.DESCENDING)\
+                    .order_by(firestore.FieldPath.document_id(), direction=firestore.Query.DESCENDING)\
+                    .limit(limit)
+    if after_ts or after_id:
+        try:
+            if not (after_ts and after_id): raise ValueError("incomplete cursor")
+            query = query.start_after({"timestamp": datetime.fromisoformat(after_ts), "__name__": logs_ref.document(after_id)})
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Rows are encoded as they arrive rather than buffered into one list
+    page = _stream_json_page(query, limit, lambda doc, row: {"ts": row.get("timestamp"), "id": doc.id})
+    return StreamingResponse(page, media_type="application/json")
 
 # --- 2. STATS ---
 @router.get("/stats")
-async def get_dashboard_stats(user: dict = Depends(get_current_user)):
+async def get_dashboard_stats(response: Response, user: dict = Depends(get_current_user)):
     if not check_permission(user["role"], Action.VIEW_DASHBOARD):
         raise HTTPException(status_code=403, detail="Access denied")
 
+    response.headers.update(DASHBOARD_CACHE_HEADERS)
+    cache_key = (user["role"], user["uid"], "stats")
+    cached = _dashboard_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+
     stats = {"projects": 0, "approvals": 0, "users": 0}
     try:
+        counts = {}
+
         # SUPER ADMIN: See All Active
         if user["role"] == UserRole.SUPER_ADMIN.value:
-            all_tenants = list(db.collection("tenants").stream())
-            stats["projects"] = len([t for t in all_tenants if not t.to_dict().get("is_archived", False)])
-            all_users = list(db.collection("users").stream())
-            stats["users"] = len([u for u in all_users if not u.to_dict().get("is_archived", False)])
+            counts["projects"] = _count_active_docs("tenants")
+            counts["users"] = _count_active_docs("users")
         
         # OTHERS: Check ACTUAL Validity of Assignments
         else:
-            user_doc = db.collection("users").document(user["uid"]).get()
-            if user_doc.exists:
-                clean_ids = get_clean_assigned_ids(user_doc.to_dict())
-                valid_count = 0
-                for tid in clean_ids:
-                    t_doc = db.collection("tenants").document(tid).get()
-                    if t_doc.exists and not t_doc.to_dict().get("is_archived", False):
-                        valid_count += 1
-                stats["projects"] = valid_count
+            counts["projects"] = _count_assigned_active(user["assigned_tenants"])
 
         # APPROVALS
-        if check_permission(user["role"], Action.APPROVE_TO_SUPER) or check_permission(user["role"], Action.PUBLISH_LIVE):
-            target_status = "pending_admin_review" if user["role"] == UserRole.ADMIN.value else "pending_super_admin_review"
-            query = db.collection("tenants").where("approval_status", "==", target_status).stream()
-            stats["approvals"] = len(list(query))
+        target_status = ROLE_TO_STATUS.get(user["role"])
+        if target_status and (check_permission(user["role"], Action.APPROVE_TO_SUPER) or check_permission(user["role"], Action.PUBLISH_LIVE)):
+            counts["approvals"] = _count_active_docs("tenants", approval_status=target_status)
 
+        # Independent aggregations run concurrently; a failed one leaves its stat at 0
+        results = await asyncio.gather(*counts.values(), return_exceptions=True)
+        failed = False
+        for name, result in zip(counts, results):
+            if isinstance(result, Exception):
+                logger.error("Stats aggregation failed for %s", name, exc_info=result)
+                failed = True
+            else:
+                stats[name] = result
+        if not failed:
+            _dashboard_cache[cache_key] = dict(stats)
         return stats
-    except Exception as e:
-        logger.error(f"Stats aggregation failed: {e}")
+    except Exception:
+        logger.exception("Stats aggregation failed")
         return stats
 
+def _count(query) -> int:
+    """Server-side count() aggregation: a single integer comes back, no documents."""
+    return query.count().get()[0][0].value
+
+def _is_active(doc: dict) -> bool:
+    """
+    In-memory twin of where("is_archived", "==", False): a doc missing the field
+    doesn't match that query, so it doesn't count as active here either.
+    """
+    return doc.get("is_archived") is False
+
+async def _count_active(query) -> int:
+    return await asyncio.to_thread(_count, query.where("is_archived", "==", False))
+
+async def _count_active_docs(collection: str, **equals) -> int:
+    """Active docs matching the equality filters; answered from the live mirror once it's warm."""
+    mirror = MIRRORS[collection]
+    if mirror.ready:
+        return sum(
+            1 for d in mirror.snapshot()
+            if _is_active(d) and all(d.get(k) == v for k, v in equals.items())
+        )
+    query = db.collection(collection)
+    for field, value in equals.items():
+        query = query.where(field, "==", value)
+    return await _count_active(query)
+
+def _tenant_id_queries(tenant_ids: List[str]):
+    """Document-ID 'in' queries over tenants, IN_QUERY_LIMIT IDs apiece."""
+    clean_ids = list(dict.fromkeys(tenant_ids))
+    tenants_ref = db.collection("tenants")
+    return [
+        tenants_ref.where(firestore.FieldPath.document_id(), "in", [tenants_ref.document(tid) for tid in clean_ids[i:i + IN_QUERY_LIMIT]])
+        for i in range(0, len(clean_ids), IN_QUERY_LIMIT)
+    ]
+
+async def _count_assigned_active(assigned_ids: List[str]) -> int:
+    """Counts the assigned tenants that exist and aren't archived, one aggregation per ID chunk."""
+    counts = await asyncio.gather(*[_count_active(q) for q in _tenant_id_queries(assigned_ids)])
+    return sum(counts)
+
+async def _active_tenant_ids(tenant_ids: List[str]) -> set:
+    """Which of the given IDs exist and aren't archived; reads only those docs, keys only."""
+    pages = await asyncio.gather(*[
+        asyncio.to_thread(q.where("is_archived", "==", False).select([]).get)
+        for q in _tenant_id_queries(tenant_ids)
+    ])
+    return {doc.id for page in pages for doc in page}
+
 # --- 3. ASSET UPLOAD ---
+ASSET_CONTENT_TYPES = frozenset({"image/jpeg", "image/png", "image/webp", "image/gif"})
+
 @router.post("/upload")
 async def upload_asset(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
     if not check_permission(current_user["role"], Action.EDIT_DRAFT):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    if file.content_type not in ["image/jpeg", "image/png", "image/webp", "image/gif"]:
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+    content_type = await asyncio.to_thread(sniff_image_type, file.file)
+    if content_type not in ASSET_CONTENT_TYPES:
         raise HTTPException(status_code=400, detail="Only images allowed")
 
     try:
-        public_url = upload_file_to_gcs(file.file, file.filename, file.content_type)
+        public_url = await asyncio.to_thread(upload_file_to_gcs, file.file, "banners", content_type, file.size)
         return {"url": public_url}
-    except Exception as e:
-        logger.error(f"Upload failed: {e}")
+    except UploadTooLarge:
+        # No Content-Length on the part, so the size was only known once measured
+        raise HTTPException(status_code=413, detail="Image too large")
+    except Exception:
+        logger.exception("Upload failed")
         raise HTTPException(status_code=500, detail="Image upload failed")
 
 # --- 4. TENANT READ OPERATIONS ---
+def _iter_active_tenants():
+    """Yields every non-archived tenant summary. Blocking; run it off the event loop."""
+    if tenant_mirror.ready:
+        for t in tenant_mirror.snapshot():
+            if _is_active(t):
+                yield format_tenant_response(t)
+        return
+    query = db.collection("tenants").where("is_archived", "==", False).select(TENANT_SUMMARY_FIELDS)
+    for doc in query.stream():
+        yield format_tenant_response(doc.to_dict())
+
+async def _load_assigned_tenants(assigned_ids: List[str]) -> List[dict]:
+    """Active tenant summaries for a user's assignments, in assignment order."""
+    clean_ids = list(dict.fromkeys(assigned_ids))
+    if not clean_ids: return []
+
+    # Single batched primary-key read instead of one get() per tenant
+    refs = [db.collection("tenants").document(tid) for tid in clean_ids]
+    snapshots = await asyncio.to_thread(lambda: list(db.get_all(refs, field_paths=TENANT_SUMMARY_FIELDS)))
+
+    # get_all() does not preserve order; keep the user's assignment order
+    tenants_list = []
+    by_id = {snap.id: snap for snap in snapshots if snap.exists}
+    for tid in clean_ids:
+        doc = by_id.get(tid)
+        if doc:
+            t = doc.to_dict()
+            if _is_active(t):
+                tenants_list.append(format_tenant_response(t))
+    return tenants_list
+
 @router.get("/my-tenants")
 async def get_user_tenants(user: dict = Depends(get_current_user)):
     if not check_permission(user["role"], Action.VIEW_DASHBOARD):
         raise HTTPException(status_code=403, detail="Access denied")
 
     try:
-        user_doc = db.collection("users").document(user["uid"]).get()
-        tenants_list = []
-
-        # SUPER ADMIN: Fetch All Active
+        # SUPER ADMIN: All Active. Read fully before responding so a Firestore error
+        # surfaces as a 500 here instead of truncating an already-started 200 body.
         if user["role"] == UserRole.SUPER_ADMIN.value:
-            docs = db.collection("tenants").stream()
-            for doc in docs:
-                t = doc.to_dict()
-                if not t.get("is_archived", False):
-                    tenants_list.append(format_tenant_response(t))
-        
+            return await asyncio.to_thread(lambda: list(_iter_active_tenants()))
+
         # OTHERS: Fetch Assigned (Robustly)
-        else:
-            if not user_doc.exists: return []
-            clean_ids = get_clean_assigned_ids(user_doc.to_dict())
-            
-            for tid in clean_ids:
-                doc = db.collection("tenants").document(tid).get()
-                if doc.exists:
-                    t = doc.to_dict()
-                    if not t.get("is_archived", False):
-                        tenants_list.append(format_tenant_response(t))
-
-        return tenants_list
-    except Exception as e:
-        logger.error(f"Error getting user tenants: {e}")
+        return await _load_assigned_tenants(user["assigned_tenants"])
+    except Exception:
+        logger.exception("Error getting user tenants")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+@router.get("/dashboard-bootstrap")
+async def get_dashboard_bootstrap(user: dict = Depends(get_current_user)):
+    """Initial dashboard payload: the user's tenants and review queue, fetched concurrently."""
+    if not check_permission(user["role"], Action.VIEW_DASHBOARD):
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    if user["role"] == UserRole.SUPER_ADMIN.value:
+        tenants_task = asyncio.to_thread(lambda: list(_iter_active_tenants()))
+    else:
+        tenants_task = _load_assigned_tenants(user["assigned_tenants"])
+
+    try:
+        tenants, approvals = await asyncio.gather(tenants_task, _load_pending_approvals(user["role"]))
+    except Exception:
+        logger.exception("Dashboard bootstrap failed")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    return {"tenants": tenants, "approvals": approvals}
+
+# Bound once; pulls every summary field in a single call per tenant
+TENANT_SUMMARY_DEFAULTS = {
+    "client_name": None, "slug": None, "approval_status": "draft",
+    "tenant_id": None, "live_config": None, "is_archived": False
+}
+_get_tenant_summary = itemgetter("client_name", "slug", "approval_status", "tenant_id", "live_config", "is_archived")
+
 def format_tenant_response(t: dict):
+    name, slug, status, tenant_id, live_config, is_archived = _get_tenant_summary({**TENANT_SUMMARY_DEFAULTS, **t})
     return {
-        "name": t.get("client_name"),
-        "slug": t.get("slug"),
-        "status": t.get("approval_status", "draft"),
-        "tenant_id": t.get("tenant_id"),
-        "live_config": t.get("live_config"),
-        "is_archived": t.get("is_archived", False)
+        "name": name,
+        "slug": slug,
+        "status": status,
+        "tenant_id": tenant_id,
+        "live_config": live_config,
+        "is_archived": is_archived
     }
 
 @router.get("/tenants/{tenant_id}")
@@ -167,12 +418,10 @@ async def get_tenant_details(tenant_id: str, current_user: dict = Depends(get_cu
          raise HTTPException(status_code=403, detail="Access denied")
 
     if current_user["role"] != UserRole.SUPER_ADMIN.value:
-        user_doc = db.collection("users").document(current_user["uid"]).get()
-        clean_ids = get_clean_assigned_ids(user_doc.to_dict()) if user_doc.exists else []
-        if tenant_id not in clean_ids:
+        if tenant_id not in current_user["assigned_tenants"]:
             raise HTTPException(status_code=403, detail="Access denied to this tenant")
 
-    doc = db.collection("tenants").document(tenant_id).get()
+    doc = await asyncio.to_thread(db.collection("tenants").document(tenant_id).get)
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
@@ -187,128 +436,174 @@ async def get_tenant_details(tenant_id: str, current_user: dict = Depends(get_cu
         "status": data.get("approval_status")
     }
 
-@router.get("/approvals")
-async def list_pending_approvals(user: dict = Depends(get_current_user)):
-    can_approve = check_permission(user["role"], Action.APPROVE_TO_SUPER) or \
-                  check_permission(user["role"], Action.PUBLISH_LIVE)
+async def _load_pending_approvals(role: str) -> List[dict]:
+    """The review queue for an approving role; empty for everyone else."""
+    can_approve = check_permission(role, Action.APPROVE_TO_SUPER) or \
+                  check_permission(role, Action.PUBLISH_LIVE)
     
     if not can_approve: return []
 
-    target_status = None
-    if user["role"] == UserRole.ADMIN.value: target_status = "pending_admin_review"
-    elif user["role"] == UserRole.SUPER_ADMIN.value: target_status = "pending_super_admin_review"
-    else: return []
+    target_status = ROLE_TO_STATUS.get(role)
+    if not target_status: return []
+
+    cache_key = (role, "approvals")
+    cached = _dashboard_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
 
     try:
-        docs = db.collection("tenants").where("approval_status", "==", target_status).stream()
-        return [{
-            "tenant_id": t.to_dict().get("tenant_id"),
-            "client_name": t.to_dict().get("client_name"),
-            "slug": t.to_dict().get("slug"),
-            "modified_by": t.to_dict().get("last_modified_by"),
-            "changes": t.to_dict().get("pending_config")
-        } for t in docs if not t.to_dict().get("is_archived", False)]
-    except Exception as e:
-        logger.error(f"Error fetching approvals: {e}")
+        if tenant_mirror.ready:
+            rows = [
+                t for t in tenant_mirror.snapshot()
+                if t.get("approval_status") == target_status and _is_active(t)
+            ]
+        else:
+            query = db.collection("tenants")\
+                      .where("approval_status", "==", target_status)\
+                      .where("is_archived", "==", False)\
+                      .select(APPROVAL_FIELDS)
+            rows = [doc.to_dict() for doc in await asyncio.to_thread(query.get)]
+        approvals = [{
+            "tenant_id": t.get("tenant_id"),
+            "client_name": t.get("client_name"),
+            "slug": t.get("slug"),
+            "modified_by": t.get("last_modified_by"),
+            "changes": t.get("pending_config")
+        } for t in rows]
+        _dashboard_cache[cache_key] = approvals
+        return list(approvals)
+    except Exception:
+        logger.exception("Error fetching approvals")
         return []
 
+@router.get("/approvals")
+async def list_pending_approvals(response: Response, user: dict = Depends(get_current_user)):
+    response.headers.update(DASHBOARD_CACHE_HEADERS)
+    return await _load_pending_approvals(user["role"])
+
 # --- 5. WORKFLOW ACTIONS ---
 @router.post("/submit-draft/{tenant_id}")
-async def submit_draft(tenant_id: str, config: ChatbotConfig, user: dict = Depends(get_current_user)):
+async def submit_draft(tenant_id: str, config: ChatbotConfig, background_tasks: BackgroundTasks, user: dict = Depends(get_current_user)):
     if not check_permission(user["role"], Action.EDIT_DRAFT):
         raise HTTPException(status_code=403, detail="Permission denied")
     
     if user["role"] != UserRole.SUPER_ADMIN.value:
-        user_doc = db.collection("users").document(user["uid"]).get()
-        clean_ids = get_clean_assigned_ids(user_doc.to_dict()) if user_doc.exists else []
-        if tenant_id not in clean_ids:
+        if tenant_id not in user["assigned_tenants"]:
             raise HTTPException(status_code=403, detail="Not assigned to this tenant")
 
-    result = await WorkflowService.process_submission(tenant_id, config.dict(), user["role"], user["email"])
+    result = await WorkflowService.process_submission(tenant_id, config.model_dump(), user["role"], user["email"])
+    if result["status"] == "unchanged":
+        return result
+    invalidate_dashboard_cache()
     await log_activity(user["email"], user["role"], "SUBMIT_DRAFT", tenant_id, "Submitted new configuration draft")
-    await notify_admins(title="New Draft Submitted", message=f"{user['email']} submitted a draft for {tenant_id}.", link="#")
+    background_tasks.add_task(notify_admins, title="New Draft Submitted", message=f"{user['email']} submitted a draft for {tenant_id}.", link="#")
     return result
 
 @router.post("/approve/{tenant_id}")
-async def approve_config(tenant_id: str, user: dict = Depends(get_current_user)):
+async def approve_config(tenant_id: str, background_tasks: BackgroundTasks, user: dict = Depends(get_current_user)):
     can_approve_to_super = check_permission(user["role"], Action.APPROVE_TO_SUPER)
     can_publish = check_permission(user["role"], Action.PUBLISH_LIVE)
 
     if not (can_approve_to_super or can_publish):
          raise HTTPException(status_code=403, detail="Permission denied")
     
-    tenant_doc = db.collection("tenants").document(tenant_id).get()
-    tenant_data = tenant_doc.to_dict()
+    # The transaction's read serves both the state transition and the submitter notification
+    result, tenant_data = await WorkflowService.process_approval(tenant_id, user["role"], user["email"])
     submitter_email = tenant_data.get("last_modified_by")
-
-    result = await WorkflowService.process_approval(tenant_id, user["role"], user["email"])
     
     action_type = "PUBLISH_LIVE" if can_publish else "APPROVE_TO_SUPER"
     log_msg = "Published configuration" if can_publish else "Approved to Super Admin"
 
+    if can_publish and tenant_data.get("slug"):
+        invalidate_demo_page(tenant_data["slug"])
+    invalidate_list_cache("tenants")
+    invalidate_dashboard_cache()
     await log_activity(user["email"], user["role"], action_type, tenant_id, log_msg)
     
     if submitter_email:
         msg = f"Your changes for {tenant_data.get('client_name')} have been approved."
         if can_publish: msg += " The site is now live."
-        await notify_user_by_email(email=submitter_email, title="Draft Approved", message=msg, link=f"/{tenant_data.get('slug')}")
+        background_tasks.add_task(notify_user_by_email, email=submitter_email, title="Draft Approved", message=msg, link=f"/{tenant_data.get('slug')}")
 
     return result
 
 # --- 6. TENANT MANAGEMENT ---
 @router.get("/tenants")
-async def list_all_tenants(show_archived: bool = Query(False), current_user: dict = Depends(get_current_user)):
-    """Used for Super Admin view AND populating the Multi-Select UI."""
+async def list_all_tenants(
+    show_archived: bool = Query(False),
+    limit: int = Query(100, ge=1, le=500),
+    start_after: Optional[str] = Query(None, description="tenant_id cursor from the previous page"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Used for Super Admin view AND populating the Multi-Select UI. Paged by tenant_id."""
     if not check_permission(current_user["role"], Action.MANAGE_USERS):
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    all_docs = [doc.to_dict() for doc in db.collection("tenants").stream()]
-    filtered = [t for t in all_docs if t.get("is_archived", False) == show_archived]
-    return filtered
+    query = db.collection("tenants")\
+              .where("is_archived", "==", show_archived)\
+              .select(TENANT_SUMMARY_FIELDS)\
+              .order_by("tenant_id")\
+              .limit(limit)
+    if start_after:
+        query = query.start_after({"tenant_id": start_after})
+
+    def page():
+        return _stream_json_page(query, limit, lambda _doc, row: row.get("tenant_id"))
+    return cached_json_body((current_user["role"], "tenants", show_archived, limit, start_after), page)
+
+def _create_tenant_doc(tenant_ref, data: dict, audit_entry: dict):
+    """Creates the tenant doc and its audit entry in one commit; raises AlreadyExists if the ID is taken."""
+    batch = db.batch()
+    batch.create(tenant_ref, data)
+    batch.set(db.collection("audit_logs").document(), audit_entry)
+    batch.commit()
 
 @router.post("/tenants")
-async def create_tenant(payload: dict, current_user: dict = Depends(get_current_user)):
+async def create_tenant(payload: CreateTenantPayload, current_user: dict = Depends(get_current_user)):
     if not check_permission(current_user["role"], Action.MANAGE_USERS):
         raise HTTPException(status_code=403, detail="Permission denied")
 
     try:
-        tenant_id = payload.get("tenant_id")
-        slug = payload.get("slug")
+        tenant_id = payload.tenant_id
+        slug = payload.slug
         if not tenant_id or not slug: raise HTTPException(status_code=400, detail="ID/Slug required")
-        if db.collection("tenants").document(tenant_id).get().exists: raise HTTPException(status_code=400, detail="Tenant ID already exists")
-
-        raw_banners = payload.get("banner_urls", [])
-        banner_list = [url.strip() for url in raw_banners.split('\n') if url.strip()] if isinstance(raw_banners, str) else raw_banners
-
-        initial_config = ChatbotConfig(
-            bot_name=payload.get("bot_name", "My Bot"),
-            primary_color=payload.get("primary_color", "#10B981"),
-            welcome_message=payload.get("welcome_message", "Hello!"),
-            custom_js=payload.get("custom_js", ""),
-            background_color=payload.get("background_color", "#F9FAFB"),
-            banner_urls=banner_list
-        )
 
-        new_tenant = Tenant(
-            tenant_id=tenant_id, client_name=payload.get("client_name"), slug=slug,
-            live_config=initial_config, approval_status=ApprovalStatus.PUBLISHED,
-            last_modified_by=current_user["email"], last_modified_at=datetime.utcnow()
-        )
-        data = new_tenant.dict()
-        data["is_archived"] = False
-        db.collection("tenants").document(tenant_id).set(data)
+        # The payload was validated at the route boundary; build the doc from it directly
+        data = {
+            "tenant_id": tenant_id,
+            "client_name": payload.client_name,
+            "slug": slug,
+            "live_config": payload.model_dump(include=LIVE_CONFIG_FIELDS),
+            "approval_status": ApprovalStatus.PUBLISHED,
+            "last_modified_by": current_user["email"],
+            "last_modified_at": firestore.SERVER_TIMESTAMP,  # Stamped by Firestore on commit
+            "is_archived": False
+        }
+
+        # Conditional create + audit entry in one commit: no preflight read, fails if the ID exists
+        tenant_ref = db.collection("tenants").document(tenant_id)
+        audit_entry = build_audit_entry(current_user["email"], current_user["role"], "CREATE_TENANT", tenant_id, f"Created {slug}")
+        try:
+            await asyncio.to_thread(_create_tenant_doc, tenant_ref, data, audit_entry)
+        except AlreadyExists:
+            raise HTTPException(status_code=400, detail="Tenant ID already exists")
         
-        await log_activity(current_user["email"], current_user["role"], "CREATE_TENANT", tenant_id, f"Created {slug}")
+        invalidate_list_cache("tenants")
+        invalidate_dashboard_cache()
         return {"message": "Tenant onboarded", "url": f"/{slug}"}
-    except Exception as e:
-        logger.error(f"Tenant creation failed: {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Tenant creation failed")
         raise HTTPException(status_code=400, detail="Failed to onboard.")
 
 @router.delete("/tenants/{tenant_id}")
 async def delete_tenant(tenant_id: str, current_user: dict = Depends(get_current_user)):
     if not check_permission(current_user["role"], Action.MANAGE_USERS):
         raise HTTPException(status_code=403, detail="Permission denied")
-    db.collection("tenants").document(tenant_id).update({"is_archived": True})
+    await asyncio.to_thread(db.collection("tenants").document(tenant_id).update, {"is_archived": True})
+    invalidate_list_cache("tenants")
+    invalidate_dashboard_cache()
     await log_activity(current_user["email"], current_user["role"], "ARCHIVE_TENANT", tenant_id, "Archived tenant")
     return {"message": "Tenant archived"}
 
@@ -316,19 +611,88 @@ async def delete_tenant(tenant_id: str, current_user: dict = Depends(get_current
 async def restore_tenant(tenant_id: str, current_user: dict = Depends(get_current_user)):
     if not check_permission(current_user["role"], Action.MANAGE_USERS):
         raise HTTPException(status_code=403, detail="Permission denied")
-    db.collection("tenants").document(tenant_id).update({"is_archived": False})
+    await asyncio.to_thread(db.collection("tenants").document(tenant_id).update, {"is_archived": False})
+    invalidate_list_cache("tenants")
+    invalidate_dashboard_cache()
     await log_activity(current_user["email"], current_user["role"], "RESTORE_TENANT", tenant_id, "Restored tenant")
     return {"message": "Tenant restored"}
 
+# One write per batch is the audit entry for that batch's tenants
+ARCHIVE_CHUNK_SIZE = WRITE_BATCH_LIMIT - 1
+
+def _set_tenants_archived(tenant_ids: List[str], archived: bool, audit_entry: dict):
+    """Flips is_archived on one chunk; its audit entry commits atomically with it."""
+    tenants_ref = db.collection("tenants")
+    batch = db.batch()
+    for tid in tenant_ids:
+        batch.update(tenants_ref.document(tid), {"is_archived": archived})
+    batch.set(db.collection("audit_logs").document(), audit_entry)
+    batch.commit()
+
+async def _bulk_set_tenants_archived(payload: TenantIdList, archived: bool, current_user: dict) -> int:
+    if not check_permission(current_user["role"], Action.MANAGE_USERS):
+        raise HTTPException(status_code=403, detail="Permission denied")
+
+    tenant_ids = list(dict.fromkeys(t.strip() for t in payload.tenant_ids if t.strip()))
+    if not tenant_ids:
+        raise HTTPException(status_code=400, detail="No tenant IDs given")
+
+    action = "ARCHIVE_TENANT" if archived else "RESTORE_TENANT"
+    chunks = [tenant_ids[i:i + ARCHIVE_CHUNK_SIZE] for i in range(0, len(tenant_ids), ARCHIVE_CHUNK_SIZE)]
+    done = 0
+    try:
+        for number, chunk in enumerate(chunks, 1):
+            audit_entry = build_audit_entry(
+                current_user["email"], current_user["role"], action, f"{len(chunk)} tenants",
+                f"Batch {number}/{len(chunks)}: " + ", ".join(chunk)
+            )
+            await asyncio.to_thread(_set_tenants_archived, chunk, archived, audit_entry)
+            done += len(chunk)
+    except Exception:
+        logger.exception("Bulk tenant update failed after %d of %d tenants", done, len(tenant_ids))
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bulk update stopped after {done} of {len(tenant_ids)} tenants; check that every tenant exists."
+        )
+    finally:
+        # Earlier chunks may have committed even if a later one failed
+        invalidate_list_cache("tenants")
+        invalidate_dashboard_cache()
+    return len(tenant_ids)
+
+@router.post("/tenants/bulk-archive")
+async def bulk_archive_tenants(payload: TenantIdList, current_user: dict = Depends(get_current_user)):
+    count = await _bulk_set_tenants_archived(payload, True, current_user)
+    return {"message": "Tenants archived", "count": count}
+
+@router.post("/tenants/bulk-restore")
+async def bulk_restore_tenants(payload: TenantIdList, current_user: dict = Depends(get_current_user)):
+    count = await _bulk_set_tenants_archived(payload, False, current_user)
+    return {"message": "Tenants restored", "count": count}
+
 # --- 7. USER MANAGEMENT ---
 @router.get("/users")
-async def list_users(show_archived: bool = Query(False), current_user: dict = Depends(get_current_user)):
+async def list_users(
+    show_archived: bool = Query(False),
+    limit: int = Query(100, ge=1, le=500),
+    start_after: Optional[str] = Query(None, description="uid cursor from the previous page"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Paged by uid."""
     if not check_permission(current_user["role"], Action.MANAGE_USERS):
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    all_users = [doc.to_dict() for doc in db.collection("users").stream()]
-    filtered = [u for u in all_users if u.get("is_archived", False) == show_archived]
-    return filtered
+    query = db.collection("users")\
+              .where("is_archived", "==", show_archived)\
+              .select(USER_LIST_FIELDS)\
+              .order_by("uid")\
+              .limit(limit)
+    if start_after:
+        query = query.start_after({"uid": start_after})
+
+    def page():
+        return _stream_json_page(query, limit, lambda _doc, row: row.get("uid"))
+    return cached_json_body((current_user["role"], "users", show_archived, limit, start_after), page)
 
 @router.post("/users")
 async def onboard_user(user_data: dict, current_user: dict = Depends(get_current_user)):
@@ -338,7 +702,8 @@ async def onboard_user(user_data: dict, current_user: dict = Depends(get_current
         raw_tenants = user_data.get("assigned_tenants", [])
         clean_tenants = [t.strip() for t in raw_tenants if t.strip()]
 
-        user_record = firebase_auth.create_user(
+        user_record = await asyncio.to_thread(
+            firebase_auth.create_user,
             email=user_data.get("email"),
             password=user_data.get("password"),
             email_verified=False
@@ -347,26 +712,128 @@ async def onboard_user(user_data: dict, current_user: dict = Depends(get_current
             uid=user_record.uid, email=user_data.get("email"), role=user_data.get("role", "contributor"),
             assigned_tenants=clean_tenants
         )
-        data = new_user.dict()
+        data = new_user.model_dump()
         data["is_archived"] = False
-        db.collection("users").document(new_user.uid).set(data)
+
+        # Auth isn't transactional; the profile and its audit entry land in one batch commit
+        batch = db.batch()
+        batch.set(db.collection("users").document(new_user.uid), data)
+        batch.set(db.collection("audit_logs").document(), build_audit_entry(
+            current_user["email"], current_user["role"], "CREATE_USER", user_data.get("email"), f"Role: {new_user.role}"
+        ))
+        await asyncio.to_thread(batch.commit)
         
-        await log_activity(current_user["email"], current_user["role"], "CREATE_USER", user_data.get("email"), f"Role: {new_user.role}")
+        invalidate_user_profile(new_user.uid)
+        invalidate_admin_list()
+        invalidate_list_cache("users")
+        invalidate_dashboard_cache()
         return {"message": "User created", "uid": new_user.uid}
-    except Exception as e:
-        logger.error(f"User onboarding error: {e}")
+    except Exception:
+        logger.exception("User onboarding error")
         raise HTTPException(status_code=400, detail="Failed to create user.")
 
+def _build_import_records(users: List[NewUser]):
+    """Hashes each password and pairs its Auth import record with the Firestore profile."""
+    records, profiles = [], []
+    for entry in users:
+        uid = uuid.uuid4().hex
+        salt = os.urandom(16)
+        password_hash = hashlib.pbkdf2_hmac("sha256", entry.password.encode(), salt, PASSWORD_HASH_ROUNDS)
+        records.append(firebase_auth.ImportUserRecord(
+            uid=uid, email=entry.email, password_hash=password_hash, password_salt=salt
+        ))
+        profiles.append(User(
+            uid=uid, email=entry.email, role=entry.role.value,
+            assigned_tenants=[t.strip() for t in entry.assigned_tenants if t.strip()]
+        ))
+    return records, profiles
+
+@router.post("/users/bulk")
+async def bulk_onboard_users(payload: BulkUserOnboard, current_user: dict = Depends(get_current_user)):
+    """Provisions many users at once: batched Auth import + pipelined profile writes."""
+    if not check_permission(current_user["role"], Action.MANAGE_USERS):
+        raise HTTPException(status_code=403, detail="Permission denied")
+
+    # 1. Pre-hash passwords so Auth can import the whole batch in one call.
+    # PBKDF2 is deliberately slow, so it runs off the event loop.
+    records, profiles = await asyncio.to_thread(_build_import_records, payload.users)
+
+    # 2. Import into Firebase Auth, 1000 per call
+    hash_alg = firebase_auth.UserImportHash.pbkdf2_sha256(rounds=PASSWORD_HASH_ROUNDS)
+    failed = set()
+    try:
+        for start in range(0, len(records), AUTH_IMPORT_BATCH_SIZE):
+            result = await asyncio.to_thread(
+                firebase_auth.import_users,
+                records[start:start + AUTH_IMPORT_BATCH_SIZE],
+                hash_alg=hash_alg
+            )
+            for error in result.errors:
+                logger.warning("Bulk import skipped %s: %s", records[start + error.index].email, error.reason)
+                failed.add(start + error.index)
+    except Exception:
+        logger.exception("Bulk user import failed")
+        raise HTTPException(status_code=400, detail="Failed to create users.")
+
+    # 3. Write Firestore profiles for the accounts that were created. An account whose
+    # profile can't be written is unusable, so its Auth user is rolled back and reported failed.
+    imported = [p for i, p in enumerate(profiles) if i not in failed]
+    unwritten = await asyncio.to_thread(_write_user_profiles, imported)
+    if unwritten:
+        logger.warning("Bulk onboarding rolled back %d users whose profiles failed to write", len(unwritten))
+        try:
+            await asyncio.to_thread(firebase_auth.delete_users, sorted(unwritten))
+        except Exception:
+            logger.exception("Failed to delete Auth users without profiles: %s", ", ".join(sorted(unwritten)))
+    created = [p for p in imported if p.uid not in unwritten]
+    failed_count = len(profiles) - len(created)
+
+    invalidate_admin_list()
+    invalidate_list_cache("users")
+    invalidate_dashboard_cache()
+    await log_activity(current_user["email"], current_user["role"], "BULK_CREATE_USER", f"{len(created)} users", ", ".join(p.email for p in created))
+    return {"message": "Users created", "created": len(created), "failed": failed_count}
+
+# BulkWriter retries a failed write up to this many attempts before giving up on it
+PROFILE_WRITE_ATTEMPTS = 5
+
+def _write_user_profiles(users: List[User]) -> set:
+    """
+    Pipelines profile writes through a BulkWriter instead of one set() per RPC.
+    close() doesn't raise for individual failures, so they're collected here: returns the
+    uids whose profile write never succeeded.
+    """
+    unwritten = set()
+
+    def on_write_error(error, _bulk_writer) -> bool:
+        if error.attempts < PROFILE_WRITE_ATTEMPTS:
+            return True
+        logger.error("Profile write failed for %s: %s", error.operation.reference.id, error.message)
+        unwritten.add(error.operation.reference.id)
+        return False
+
+    bulk_writer = db.bulk_writer()
+    bulk_writer.on_write_error(on_write_error)
+    for new_user in users:
+        data = new_user.model_dump()
+        data["is_archived"] = False
+        bulk_writer.set(db.collection("users").document(new_user.uid), data)
+    bulk_writer.close()
+    return unwritten
+
 @router.put("/users/{uid}/role")
 async def update_user_role(uid: str, payload: RoleUpdate, current_user: dict = Depends(get_current_user)):
     if not check_permission(current_user["role"], Action.MANAGE_USERS):
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    valid_roles = [r.value for r in UserRole]
-    if payload.role not in valid_roles:
-        raise HTTPException(status_code=400, detail=f"Invalid role. Must be one of {valid_roles}")
+    if payload.role not in VALID_ROLES:
+        raise HTTPException(status_code=400, detail=f"Invalid role. Must be one of {sorted(VALID_ROLES)}")
 
-    db.collection("users").document(uid).update({"role": payload.role})
+    await asyncio.to_thread(db.collection("users").document(uid).update, {"role": payload.role})
+    invalidate_user_profile(uid)
+    invalidate_admin_list()
+    invalidate_list_cache("users")
+    invalidate_dashboard_cache()
     await log_activity(current_user["email"], current_user["role"], "UPDATE_ROLE", uid, f"Changed role to {payload.role}")
     return {"message": "Role updated"}
 
@@ -382,56 +849,89 @@ async def update_user_tenants(uid: str, payload: TenantAssignmentUpdate, current
     # 2. VALIDATION: Check which ones actually exist
     valid_tenants = []
     if clean_tenants:
-        # Optimization: Fetch all active tenants once (better than loop for small/medium datasets)
-        all_tenant_docs = db.collection("tenants").stream()
-        active_tenant_ids = {doc.id for doc in all_tenant_docs if not doc.to_dict().get("is_archived", False)}
+        active_tenant_ids = await _active_tenant_ids(clean_tenants)
         
         for tid in clean_tenants:
             if tid in active_tenant_ids:
                 valid_tenants.append(tid)
             else:
-                logger.warning(f"Ignored invalid/archived tenant ID '{tid}' during assignment for user {uid}")
+                logger.warning("Ignored invalid/archived tenant ID '%s' during assignment for user %s", tid, uid)
 
     # 3. Update Database with ONLY valid IDs
-    db.collection("users").document(uid).update({"assigned_tenants": valid_tenants})
+    await asyncio.to_thread(db.collection("users").document(uid).update, {"assigned_tenants": valid_tenants})
     
+    invalidate_user_profile(uid)
+    invalidate_list_cache("users")
+    invalidate_dashboard_cache()
     await log_activity(current_user["email"], current_user["role"], "UPDATE_ACCESS", uid, f"Assigned: {valid_tenants}")
     return {"message": "Tenant assignments updated", "valid_count": len(valid_tenants)}
 
+async def _set_user_archived(uid: str, archived: bool):
+    """Updates Auth `disabled` and the profile's `is_archived` concurrently. Returns (auth_error, profile_error)."""
+    auth_result, profile_result = await asyncio.gather(
+        asyncio.to_thread(firebase_auth.update_user, uid, disabled=archived),
+        asyncio.to_thread(db.collection("users").document(uid).update, {"is_archived": archived}),
+        return_exceptions=True
+    )
+    auth_error = auth_result if isinstance(auth_result, Exception) else None
+    profile_error = profile_result if isinstance(profile_result, Exception) else None
+    return auth_error, profile_error
+
+def _partial_access_update(uid: str, message: str, auth_error, profile_error) -> JSONResponse:
+    """207 response for when only one of the Auth/profile updates landed."""
+    logger.error("%s for %s: auth=%s profile=%s", message, uid, auth_error, profile_error)
+    return JSONResponse(status_code=207, content={
+        "message": message,
+        "auth_updated": auth_error is None,
+        "profile_updated": profile_error is None
+    })
+
 @router.delete("/users/{uid}")
 async def offboard_user(uid: str, current_user: dict = Depends(get_current_user)):
     if not check_permission(current_user["role"], Action.MANAGE_USERS):
         raise HTTPException(status_code=403, detail="Permission denied")
-    try:
-        firebase_auth.update_user(uid, disabled=True)
-        db.collection("users").document(uid).update({"is_archived": True})
-        await log_activity(current_user["email"], current_user["role"], "ARCHIVE_USER", uid, "Disabled user access")
-        return {"message": "User archived"}
-    except Exception:
+
+    auth_error, profile_error = await _set_user_archived(uid, True)
+    if auth_error and profile_error:
         raise HTTPException(status_code=400, detail="Failed to archive user.")
 
+    invalidate_list_cache("users")
+    invalidate_dashboard_cache()
+    await log_activity(current_user["email"], current_user["role"], "ARCHIVE_USER", uid, "Disabled user access")
+    if auth_error or profile_error:
+        return _partial_access_update(uid, "User partially archived", auth_error, profile_error)
+    return {"message": "User archived"}
+
 @router.post("/users/{uid}/restore")
 async def restore_user(uid: str, current_user: dict = Depends(get_current_user)):
     if not check_permission(current_user["role"], Action.MANAGE_USERS):
         raise HTTPException(status_code=403, detail="Permission denied")
-    try:
-        firebase_auth.update_user(uid, disabled=False)
-        db.collection("users").document(uid).update({"is_archived": False})
-        await log_activity(current_user["email"], current_user["role"], "RESTORE_USER", uid, "Restored user access")
-        return {"message": "User restored"}
-    except Exception:
+
+    auth_error, profile_error = await _set_user_archived(uid, False)
+    if auth_error and profile_error:
         raise HTTPException(status_code=400, detail="Failed to restore user.")
 
+    invalidate_list_cache("users")
+    invalidate_dashboard_cache()
+    await log_activity(current_user["email"], current_user["role"], "RESTORE_USER", uid, "Restored user access")
+    if auth_error or profile_error:
+        return _partial_access_update(uid, "User partially restored", auth_error, profile_error)
+    return {"message": "User restored"}
+
 # --- ACCESS REQUESTS (Super Admin) ---
 @router.get("/access-requests")
-async def list_access_requests(user: dict = Depends(get_current_user)):
-    """Fetches all pending access requests. (Super Admin Only)"""
+async def list_access_requests(limit: int = Query(50, ge=1, le=200), user: dict = Depends(get_current_user)):
+    """Fetches the newest pending access requests. (Super Admin Only)"""
     if not check_permission(user["role"], Action.MANAGE_USERS):
         raise HTTPException(status_code=403, detail="Permission denied")
     
     try:
-        # FIX: Removed .order_by("timestamp") to prevent Missing Index Error
-        docs = db.collection("access_requests").where("status", "==", "pending").stream()
+        # Served by the (status, timestamp DESC) composite index
+        query = db.collection("access_requests")\
+                  .where("status", "==", "pending")\
+                  .order_by("timestamp", direction=firestore.Query.DESCENDING)\
+                  .limit(limit)
+        docs = await asyncio.to_thread(query.get)
         
         requests = []
         for doc in docs:
@@ -439,12 +939,9 @@ async def list_access_requests(user: dict = Depends(get_current_user)):
             d["id"] = doc.id
             requests.append(d)
         
-        # Sort in Python instead (Robust)
-        requests.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        
         return requests
-    except Exception as e:
-        logger.error(f"Error fetching requests: {e}")
+    except Exception:
+        logger.exception("Error fetching requests")
         return []
 
 @router.post("/access-requests/{request_id}/approve")
@@ -456,7 +953,7 @@ async def approve_access_request(request_id: str, user: dict = Depends(get_curre
     try:
         # 1. Fetch Request Data
         req_ref = db.collection("access_requests").document(request_id)
-        req_doc = req_ref.get()
+        req_doc = await asyncio.to_thread(req_ref.get)
         if not req_doc.exists:
             raise HTTPException(status_code=404, detail="Request not found")
         data = req_doc.to_dict()
@@ -466,7 +963,8 @@ async def approve_access_request(request_id: str, user: dict = Depends(get_curre
 
         # 3. Create Firebase User
         try:
-            user_record = firebase_auth.create_user(
+            user_record = await asyncio.to_thread(
+                firebase_auth.create_user,
                 email=data["email"],
                 password=temp_password,
                 display_name=data["full_name"],
@@ -484,18 +982,20 @@ async def approve_access_request(request_id: str, user: dict = Depends(get_curre
             assigned_tenants=[]
         )
         # Assuming you have the User model logic to convert to dict
-        user_dict = new_user.dict()
+        user_dict = new_user.model_dump()
         user_dict["is_archived"] = False
-        db.collection("users").document(new_user.uid).set(user_dict)
+        await asyncio.to_thread(db.collection("users").document(new_user.uid).set, user_dict)
 
         # 5. Mark Request as Approved
-        req_ref.update({
+        await asyncio.to_thread(req_ref.update, {
             "status": "approved",
             "processed_by": user["email"],
-            "processed_at": datetime.utcnow()
+            "processed_at": firestore.SERVER_TIMESTAMP
         })
 
         # 6. Log & Notify
+        invalidate_list_cache("users")
+        invalidate_dashboard_cache()
         await log_activity(user["email"], user["role"], "APPROVE_ACCESS", data["email"], "Created user from request")
         
         # In real world: Send email to data["email"] with temp_password
@@ -504,8 +1004,8 @@ async def approve_access_request(request_id: str, user: dict = Depends(get_curre
 
     except HTTPException as he:
         raise he
-    except Exception as e:
-        logger.error(f"Approval failed: {e}")
+    except Exception:
+        logger.exception("Approval failed")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/access-requests/{request_id}/reject")
@@ -515,11 +1015,11 @@ async def reject_access_request(request_id: str, user: dict = Depends(get_curren
         raise HTTPException(status_code=403, detail="Permission denied")
     
     try:
-        db.collection("access_requests").document(request_id).update({
+        await asyncio.to_thread(db.collection("access_requests").document(request_id).update, {
             "status": "rejected",
             "processed_by": user["email"],
-            "processed_at": datetime.utcnow()
+            "processed_at": firestore.SERVER_TIMESTAMP
         })
         return {"message": "Request rejected"}
-    except Exception as e:
+    except Exception:
         raise HTTPException(status_code=500, detail="Failed to reject")
\ No newline at end of file
@@ -1,11 +1,15 @@
+import asyncio
+import hashlib
 import logging
-from typing import Optional
-from datetime import datetime
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from cachetools import TLRUCache, TTLCache
 from firebase_admin import auth as firebase_auth
+from google.cloud import firestore
 from app.db.firestore import db
 from pydantic import BaseModel, EmailStr
-from app.storage import upload_file_to_gcs
-from fastapi import APIRouter, Depends, HTTPException, status, Header, UploadFile, File
+from app.storage import MAX_UPLOAD_BYTES, UploadTooLarge, sniff_image_type, upload_file_to_gcs
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Header, UploadFile, File
 
 # Import the notification service
 from app.services.notifications import notify_admins
@@ -29,6 +33,78 @@ class UserUpdate(BaseModel):
 class PasswordUpdate(BaseModel):
     password: str
 
+AVATAR_CONTENT_TYPES = frozenset({"image/jpeg", "image/png", "image/webp"})
+
+# --- TOKEN CACHE ---
+# Verified claims keyed by a digest of the raw bearer token, so repeat requests
+# skip verify_id_token. Entries never outlive the token.
+TOKEN_CACHE_TTL = 300
+
+def _token_expiry(_key, entry, now):
+    exp, _ = entry
+    return now + min(exp - time.time(), TOKEN_CACHE_TTL)
+
+_token_cache = TLRUCache(maxsize=10_000, ttu=_token_expiry)
+
+# --- PROFILE CACHE ---
+# Role and tenant assignments from users/{uid}, read once and shared by every
+# handler. Admin endpoints evict the entry whenever they change either field.
+PROFILE_CACHE_TTL = 60
+_profile_cache = TTLCache(maxsize=50_000, ttl=PROFILE_CACHE_TTL)
+
+def get_clean_assigned_ids(user_doc_dict: dict) -> List[str]:
+    """Helper to safely extract and clean assigned tenant IDs."""
+    raw = user_doc_dict.get("assigned_tenants", [])
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    return [str(item).strip() for item in raw if item and str(item).strip()]
+
+def invalidate_user_profile(uid: str):
+    _profile_cache.pop(uid, None)
+
+# --- IN-FLIGHT COALESCING ---
+# A dashboard load fires several requests with the same token at once. On a cold
+# cache they share one verify_id_token / profile read instead of racing N of them.
+_inflight: Dict[object, asyncio.Task] = {}
+
+async def _single_flight(key, fetch: Callable[[], Awaitable]):
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one client disconnecting doesn't cancel the fetch for the others
+    return await asyncio.shield(task)
+
+async def _verify_token(cache_key: bytes, token: str) -> dict:
+    decoded_token = await asyncio.to_thread(firebase_auth.verify_id_token, token)
+    claims = {
+        "uid": decoded_token["uid"],
+        "email": decoded_token["email"],
+        "name": decoded_token.get("name"),
+        "picture": decoded_token.get("picture")
+    }
+    _token_cache[cache_key] = (decoded_token["exp"], claims)
+    return claims
+
+async def _fetch_user_profile(uid: str) -> dict:
+    user_doc = await asyncio.to_thread(
+        db.collection("users").document(uid).get, field_paths=["role", "assigned_tenants"]
+    )
+    user_data = user_doc.to_dict() if user_doc.exists else {}
+    profile = {
+        "role": user_data.get("role", "contributor"),
+        "assigned_tenants": get_clean_assigned_ids(user_data)
+    }
+    _profile_cache[uid] = profile
+    return profile
+
+async def _load_user_profile(uid: str) -> dict:
+    profile = _profile_cache.get(uid)
+    if profile is None:
+        profile = await _single_flight(("profile", uid), lambda: _fetch_user_profile(uid))
+    return profile
+
 # --- DEPENDENCY ---
 async def get_current_user(authorization: str = Header(...)):
     """
@@ -38,25 +114,20 @@ async def get_current_user(authorization: str = Header(...)):
         if not authorization.startswith("Bearer "):
             raise HTTPException(status_code=401, detail="Invalid header format")
         
-        token = authorization.split("Bearer ")[1]
-        decoded_token = firebase_auth.verify_id_token(token)
-        uid = decoded_token["uid"]
-        email = decoded_token["email"]
-
-        # Fetch Role from Firestore
-        user_doc = db.collection("users").document(uid).get()
-        if user_doc.exists:
-            user_data = user_doc.to_dict()
-            role = user_data.get("role", "contributor")
+        token = authorization[7:]  # len("Bearer ")
+        cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        cached = _token_cache.get(cache_key)
+        if cached:
+            claims = cached[1]
         else:
-            role = "contributor"
+            claims = await _single_flight(("token", cache_key), lambda: _verify_token(cache_key, token))
 
+        # Fetch Role and assignments (cached per uid)
+        profile = await _load_user_profile(claims["uid"])
         return {
-            "uid": uid, 
-            "email": email, 
-            "role": role, 
-            "name": decoded_token.get("name"),
-            "picture": decoded_token.get("picture")
+            **claims,
+            "role": profile["role"],
+            "assigned_tenants": list(profile["assigned_tenants"])
         }
     except Exception as e:
         logger.error(f"Auth failed: {e}")
@@ -70,7 +141,14 @@ async def get_current_user(authorization: str = Header(...)):
 @router.get("/me")
 async def read_users_me(current_user: dict = Depends(get_current_user)):
     """Returns the current user's profile information."""
-    return current_user
+    # Explicit fields: the dependency also carries internal data (tenant assignments)
+    return {
+        "uid": current_user["uid"],
+        "email": current_user["email"],
+        "role": current_user["role"],
+        "name": current_user["name"],
+        "picture": current_user["picture"]
+    }
 
 @router.put("/me")
 async def update_profile(data: UserUpdate, current_user: dict = Depends(get_current_user)):
@@ -83,7 +161,7 @@ async def update_profile(data: UserUpdate, current_user: dict = Depends(get_curr
         if not update_args:
             return {"message": "No changes requested"}
 
-        firebase_auth.update_user(current_user["uid"], **update_args)
+        await asyncio.to_thread(firebase_auth.update_user, current_user["uid"], **update_args)
         return {"message": "Profile updated successfully"}
     except Exception as e:
         logger.error(f"Profile update failed: {e}")
@@ -96,7 +174,7 @@ async def change_password(data: PasswordUpdate, current_user: dict = Depends(get
         if len(data.password) < 6:
             raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
             
-        firebase_auth.update_user(current_user["uid"], password=data.password)
+        await asyncio.to_thread(firebase_auth.update_user, current_user["uid"], password=data.password)
         return {"message": "Password changed successfully"}
     except Exception as e:
         logger.error(f"Password change failed: {e}")
@@ -105,48 +183,59 @@ async def change_password(data: PasswordUpdate, current_user: dict = Depends(get
 @router.post("/me/avatar")
 async def upload_avatar(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
     """Allows any logged-in user to upload an avatar."""
-    if file.content_type not in ["image/jpeg", "image/png", "image/webp"]:
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+    content_type = await asyncio.to_thread(sniff_image_type, file.file)
+    if content_type not in AVATAR_CONTENT_TYPES:
         raise HTTPException(status_code=400, detail="Only images allowed")
 
     try:
-        filename = f"avatars/{current_user['uid']}-{file.filename}"
-        public_url = upload_file_to_gcs(file.file, filename, file.content_type)
+        public_url = await asyncio.to_thread(upload_file_to_gcs, file.file, "avatars", content_type, file.size)
         
-        firebase_auth.update_user(current_user["uid"], photo_url=public_url)
+        await asyncio.to_thread(firebase_auth.update_user, current_user["uid"], photo_url=public_url)
         return {"url": public_url}
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Image too large")
     except Exception as e:
         logger.error(f"Avatar upload failed: {e}")
         raise HTTPException(status_code=500, detail="Upload failed")
 
+def _is_registered(email: str) -> bool:
+    try:
+        firebase_auth.get_user_by_email(email)
+        return True
+    except firebase_auth.UserNotFoundError:
+        return False
+
 @router.post("/request-access")
-async def request_access(request_data: AccessRequest):
+async def request_access(request_data: AccessRequest, background_tasks: BackgroundTasks):
     """
     Public endpoint for users to request access.
     """
-    # 1. Check duplication in Auth
-    try:
-        firebase_auth.get_user_by_email(request_data.email)
+    # 1-2. Check duplication in Auth and pending duplicates in DB, concurrently
+    pending_query = db.collection("access_requests").where("email", "==", request_data.email).where("status", "==", "pending").select([]).limit(1)
+    registered, existing_req = await asyncio.gather(
+        asyncio.to_thread(_is_registered, request_data.email),
+        asyncio.to_thread(pending_query.get)
+    )
+    if registered:
         raise HTTPException(status_code=400, detail="User already registered. Please log in.")
-    except firebase_auth.UserNotFoundError:
-        pass 
-
-    # 2. Check pending duplicates in DB
-    existing_req = db.collection("access_requests").where("email", "==", request_data.email).where("status", "==", "pending").get()
     if existing_req:
         raise HTTPException(status_code=400, detail="A pending request for this email already exists.")
 
     try:
         # 3. Save Request
         doc_ref = db.collection("access_requests").document()
-        data = request_data.dict()
+        data = request_data.model_dump()
         data.update({
             "status": "pending",
-            "timestamp": datetime.utcnow().isoformat() # ISO format for robust sorting
+            "timestamp": firestore.SERVER_TIMESTAMP # Native timestamp, assigned on commit
         })
-        doc_ref.set(data)
+        await asyncio.to_thread(doc_ref.set, data)
 
         # 4. Notify Admins (Triggers Bell Icon)
-        await notify_admins(
+        background_tasks.add_task(
+            notify_admins,
             title="New Access Request", 
             message=f"{request_data.full_name} requests access.", 
             link="requests"
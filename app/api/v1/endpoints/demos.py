@@ -1,10 +1,32 @@
+import asyncio
+import os
+from cachetools import TTLCache
 from fastapi import APIRouter, HTTPException, Request, Depends
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from app.db.firestore import db
+from app.services.live_cache import tenant_mirror
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+# Templates only change on deploy; skip the per-render mtime check outside development
+templates.env.auto_reload = os.getenv("ENVIRONMENT") == "development"
+_DEMO_TEMPLATE = templates.get_template("demo_base.html")
+
+DEMO_TENANT_FIELDS = ["client_name", "live_config", "pending_config"]
+
+# --- PAGE CACHE ---
+# Rendered live pages per slug. live_config only changes on publish, which evicts
+# the slug; the TTL bounds staleness for anything else. Previews are never cached.
+DEMO_PAGE_CACHE_TTL = 30
+DEMO_PAGE_CACHE_HEADERS = {"Cache-Control": f"public, max-age={DEMO_PAGE_CACHE_TTL}"}
+_page_cache = TTLCache(maxsize=1024, ttl=DEMO_PAGE_CACHE_TTL)
+
+def invalidate_demo_page(slug: str):
+    _page_cache.pop(slug, None)
+
+# Paths the catch-all still receives (browser probes, bare app prefixes) that can never be a tenant slug
+RESERVED_SLUGS = frozenset({"dashboard", "login", "auth", "static", "api", "health", "me", "favicon.ico", "robots.txt"})
 
 @router.get("/{slug}", response_class=HTMLResponse)
 async def render_demo_page(slug: str, request: Request, preview: bool = False):
@@ -13,15 +35,22 @@ async def render_demo_page(slug: str, request: Request, preview: bool = False):
     - Standard: Loads 'live_config'.
     - ?preview=true: Loads 'pending_config' (Draft) if it exists.
     """
-    # 1. Fetch Tenant
-    tenants_ref = db.collection("tenants")
-    query = tenants_ref.where("slug", "==", slug).limit(1).stream()
-    
-    tenant_doc = next(query, None)
-    if not tenant_doc:
+    if slug.lower() in RESERVED_SLUGS:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    if not preview:
+        cached = _page_cache.get(slug)
+        if cached is not None:
+            return HTMLResponse(cached, headers=DEMO_PAGE_CACHE_HEADERS)
+
+    # 1. Fetch Tenant (from the live mirror; Firestore until it's warm)
+    if tenant_mirror.ready:
+        tenant_data = tenant_mirror.find(slug)
+    else:
+        query = db.collection("tenants").where("slug", "==", slug).select(DEMO_TENANT_FIELDS).limit(1)
+        docs = await asyncio.to_thread(query.get)
+        tenant_data = docs[0].to_dict() if docs else None
+    if not tenant_data:
         raise HTTPException(status_code=404, detail="Tenant not found")
-    
-    tenant_data = tenant_doc.to_dict()
     
     # 2. Determine Config Source
     config = tenant_data.get("live_config")
@@ -45,9 +74,13 @@ async def render_demo_page(slug: str, request: Request, preview: bool = False):
 
     # 3. Render Template
     # We pass 'is_preview' to the template so we can show a warning banner
-    return templates.TemplateResponse("demo_base.html", {
+    html = _DEMO_TEMPLATE.render({
         "request": request,
         "client_name": tenant_data.get("client_name", "Lumina Demo"),
         "config": config,
         "is_preview": is_preview_mode 
-    })
\ No newline at end of file
+    }).encode()
+    if preview:
+        return HTMLResponse(html)
+    _page_cache[slug] = html
+    return HTMLResponse(html, headers=DEMO_PAGE_CACHE_HEADERS)
\ No newline at end of file
@@ -1,27 +1,34 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from app.api.v1.endpoints.auth import get_current_user
 from app.db.firestore import db
-from datetime import datetime
 
 router = APIRouter()
 
+NOTIFICATION_PAGE_SIZE = 20
+
 @router.get("/")
 async def get_my_notifications(user: dict = Depends(get_current_user)):
     """Fetches the current user's unread notifications."""
     try:
-        # Fetch notifications (unread first, then by time)
-        docs = db.collection("users").document(user["uid"])\
-                 .collection("notifications")\
-                 .order_by("timestamp", direction="DESCENDING")\
-                 .limit(20)\
-                 .stream()
-        
+        # Fetch notifications (unread first, then by time). Old read items can
+        # no longer crowd unread ones out of the page.
+        notifications_ref = db.collection("users").document(user["uid"]).collection("notifications")
+        unread_docs, read_docs = await asyncio.gather(*[
+            asyncio.to_thread(
+                notifications_ref.where("is_read", "==", is_read)
+                                 .order_by("timestamp", direction="DESCENDING")
+                                 .limit(NOTIFICATION_PAGE_SIZE)
+                                 .get
+            )
+            for is_read in (False, True)
+        ])
+        docs = (unread_docs + read_docs)[:NOTIFICATION_PAGE_SIZE]
+
         notifications = []
         for doc in docs:
             n = doc.to_dict()
             n["id"] = doc.id
-            if isinstance(n.get("timestamp"), datetime):
-                n["timestamp"] = n["timestamp"].isoformat()
             notifications.append(n)
         return notifications
     except Exception as e:
@@ -34,7 +41,7 @@ async def mark_notification_read(notification_id: str, user: dict = Depends(get_
     try:
         ref = db.collection("users").document(user["uid"])\
                 .collection("notifications").document(notification_id)
-        ref.update({"is_read": True})
+        await asyncio.to_thread(ref.update, {"is_read": True})
         return {"status": "success"}
     except Exception:
         raise HTTPException(status_code=400, detail="Failed to update")
@@ -43,8 +50,9 @@ async def mark_notification_read(notification_id: str, user: dict = Depends(get_
 async def delete_notification(notification_id: str, user: dict = Depends(get_current_user)):
     """Deletes a notification."""
     try:
-        db.collection("users").document(user["uid"])\
-          .collection("notifications").document(notification_id).delete()
+        ref = db.collection("users").document(user["uid"])\
+                .collection("notifications").document(notification_id)
+        await asyncio.to_thread(ref.delete)
         return {"status": "deleted"}
     except Exception:
         raise HTTPException(status_code=400, detail="Failed to delete")
\ No newline at end of file
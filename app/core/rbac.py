@@ -60,8 +60,16 @@ RBAC_POLICY: Dict[UserRole, List[Action]] = {
     ]
 }
 
+# --- 4. Compiled Policy (Role -> Action Bitmask) ---
+# Each action gets one bit; each role's allowed actions are OR-ed into one int.
+ACTION_BITS: Dict[Action, int] = {action: 1 << i for i, action in enumerate(Action)}
+
+ROLE_MASK: Dict[str, int] = {
+    role.value: sum(ACTION_BITS[action] for action in actions)
+    for role, actions in RBAC_POLICY.items()
+}
+
 def check_permission(role: str, action: Action) -> bool:
     """Helper function to check if a role is allowed to perform an action."""
-    # Default to empty list if role is unknown/invalid
-    allowed_actions = RBAC_POLICY.get(role, [])
-    return action in allowed_actions
\ No newline at end of file
+    # Unknown/invalid roles get an empty mask
+    return bool(ROLE_MASK.get(role, 0) & ACTION_BITS[action])
\ No newline at end of file
@@ -1,11 +1,14 @@
 import os
+import functools
 import firebase_admin
 from firebase_admin import credentials, firestore
 
 PROJECT_ID = os.getenv("GCP_PROJECT_ID")
 SA_KEY_PATH = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 
-def initialize_db():
+@functools.lru_cache(maxsize=1)
+def get_db():
+    """Initializes the Firebase app once and returns the process-wide Firestore client."""
     if not firebase_admin._apps:
         if os.getenv("ENVIRONMENT") == "development":
             if os.path.exists(SA_KEY_PATH):
@@ -20,4 +23,4 @@ def initialize_db():
             print(f"☁️ Connected via Default Identity (Project: {PROJECT_ID})")
     return firestore.client()
 
-db = initialize_db()
\ No newline at end of file
+db = get_db()
\ No newline at end of file
@@ -1,19 +1,23 @@
 import os
+import functools
 from google.cloud import storage
 from datetime import timedelta
 
 # Set your GCS Bucket Name (Created in GCP Console)
 BUCKET_NAME = os.getenv("GCP_STORAGE_BUCKET", "lumina-assets")
 
+@functools.lru_cache(maxsize=1)
+def _get_bucket():
+    """Created on first use and shared, so each call reuses the same HTTP session."""
+    return storage.Client().bucket(BUCKET_NAME)
+
 def upload_blob(file_obj, destination_blob_name):
     """
     Uploads a file to the GCS bucket.
     :param file_obj: The file content (from FastAPI's UploadFile)
     :param destination_blob_name: The name it will have in the bucket (e.g., 'logos/client_a.png')
     """
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blob = bucket.blob(destination_blob_name)
+    blob = _get_bucket().blob(destination_blob_name)
 
     # Upload the file
     blob.upload_from_file(file_obj)
@@ -28,9 +32,7 @@ def generate_signed_url(blob_name):
     Generates a temporary URL that expires in 1 hour. 
     Great for private/secure assets.
     """
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blob = bucket.blob(blob_name)
+    blob = _get_bucket().blob(blob_name)
 
     url = blob.generate_signed_url(
         version="v4",
@@ -1,22 +1,51 @@
+import asyncio
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 from dotenv import load_dotenv
 
 # Load Environment Variables
 load_dotenv()
 
+# App loggers ("lumina.*") take their level from the environment
+logging.getLogger("lumina").setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
 # Import Routers
 # Ensure app/api/v1/endpoints/notifications.py exists
 from app.api.v1.endpoints import admin, demos, auth, notifications
+from app.services.live_cache import MIRRORS
+from app.services.audit import start_audit_flusher, stop_audit_flusher
+
+# Threads for blocking Firebase/Firestore/GCS calls. Every handler offloads them via
+# asyncio.to_thread, which runs on the loop's default executor; the stock pool
+# (min(32, cpu + 4)) is sized for CPU work and caps concurrent RPCs on small instances.
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "32"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io")
+    )
+    # Live in-memory views of tenants/users; handlers fall back to Firestore until warm
+    for mirror in MIRRORS.values():
+        mirror.start()
+    start_audit_flusher()
+    yield
+    await stop_audit_flusher()
+    for mirror in MIRRORS.values():
+        mirror.stop()
 
 app = FastAPI(
     title="Lumina Platform",
-    description="Chatbot Orchestration Backend"
+    description="Chatbot Orchestration Backend",
+    default_response_class=ORJSONResponse,  # orjson instead of stdlib json for every JSON route
+    lifespan=lifespan
 )
 
 # --- 1. SECURITY & MIDDLEWARE ---
@@ -31,24 +60,41 @@ app.add_middleware(
 )
 
 # CSP: Prevent XSS attacks by restricting script sources
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-        # UPDATED POLICY:
-        # - script-src: Added 'https://apis.google.com' (Google Sign-In), 'https://chatbot.ema.co' (Widget), Tailwind, FontAwesome
-        # - frame-src: Added 'https://accounts.google.com' (OAuth), 'https://chatbot.ema.co' (Widget Iframe)
-        # - img-src: Added 'https:' (Google Cloud Storage Images & User Avatars)
-        # - connect-src: Added Google APIs and Firebase services
-        response.headers["Content-Security-Policy"] = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' https://cdn.tailwindcss.com https://cdnjs.cloudflare.com https://www.gstatic.com https://chatbot.ema.co https://apis.google.com; "
-            "connect-src 'self' https://identitytoolkit.googleapis.com https://securetoken.googleapis.com https://www.googleapis.com https://www.gstatic.com; "
-            "img-src 'self' data: https:; "
-            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-            "font-src 'self' https://fonts.gstatic.com; "
-            "frame-src 'self' https://accounts.google.com https://*.firebaseapp.com https://chatbot.ema.co;"
-        )
-        return response
+# UPDATED POLICY:
+# - script-src: Added 'https://apis.google.com' (Google Sign-In), 'https://chatbot.ema.co' (Widget), Tailwind, FontAwesome
+# - frame-src: Added 'https://accounts.google.com' (OAuth), 'https://chatbot.ema.co' (Widget Iframe)
+# - img-src: Added 'https:' (Google Cloud Storage Images & User Avatars)
+# - connect-src: Added Google APIs and Firebase services
+CONTENT_SECURITY_POLICY = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' https://cdn.tailwindcss.com https://cdnjs.cloudflare.com https://www.gstatic.com https://chatbot.ema.co https://apis.google.com; "
+    "connect-src 'self' https://identitytoolkit.googleapis.com https://securetoken.googleapis.com https://www.googleapis.com https://www.gstatic.com; "
+    "img-src 'self' data: https:; "
+    "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+    "font-src 'self' https://fonts.gstatic.com; "
+    "frame-src 'self' https://accounts.google.com https://*.firebaseapp.com https://chatbot.ema.co;"
+)
+_CSP_HEADER = (b"content-security-policy", CONTENT_SECURITY_POLICY.encode())
+
+class SecurityHeadersMiddleware:
+    """
+    Plain ASGI middleware: appends the pre-encoded CSP header to every response
+    start message, without BaseHTTPMiddleware's per-request task and body streaming.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_csp(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), _CSP_HEADER]
+            await send(message)
+
+        await self.app(scope, receive, send_with_csp)
 
 app.add_middleware(SecurityHeadersMiddleware)
 
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
 
 class ApprovalStatus:
     DRAFT = "draft"
@@ -9,6 +9,8 @@ class ApprovalStatus:
     PUBLISHED = "published"
 
 class ChatbotConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     bot_name: str
     primary_color: str = "#10B981"
     welcome_message: str = "Hello! How can I help you?"
@@ -22,6 +24,8 @@ class ChatbotConfig(BaseModel):
     custom_js: Optional[str] = "" 
 
 class Tenant(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     tenant_id: str
     client_name: str
     slug: str
@@ -29,4 +33,4 @@ class Tenant(BaseModel):
     pending_config: Optional[ChatbotConfig] = None
     approval_status: str = ApprovalStatus.DRAFT
     last_modified_by: str
-    last_modified_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    last_modified_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
\ No newline at end of file
@@ -1,23 +1,82 @@
-from datetime import datetime
+import asyncio
+from typing import List, Optional
+from google.cloud import firestore
 from app.db.firestore import db
 import logging
 
 logger = logging.getLogger("lumina.audit")
 
+# Entries are queued by log_activity and committed by one background flusher,
+# up to a full WriteBatch (500 writes) per commit.
+AUDIT_BATCH_SIZE = 500
+_queue: Optional[asyncio.Queue] = None
+_flusher: Optional[asyncio.Task] = None
+
+def build_audit_entry(actor_email: str, actor_role: str, action: str, target_id: str, details: str = "") -> dict:
+    """
+    Shapes an 'audit_logs' document; lets callers commit it alongside their own writes.
+    """
+    return {
+        "timestamp": firestore.SERVER_TIMESTAMP,  # Assigned on commit; monotonic for the log cursor
+        "actor_email": actor_email,
+        "actor_role": actor_role,
+        "action": action,
+        "target_id": target_id,
+        "details": details
+    }
+
+def _commit_entries(entries: List[dict]):
+    batch = db.batch()
+    for entry in entries:
+        batch.set(db.collection("audit_logs").document(), entry)
+    batch.commit()
+
+async def _write_entries(entries: List[dict]):
+    try:
+        await asyncio.to_thread(_commit_entries, entries)
+    except Exception:
+        logger.exception("Failed to write %d audit log entries", len(entries))
+
+def _drain(first: Optional[dict] = None) -> List[dict]:
+    entries = [first] if first is not None else []
+    while len(entries) < AUDIT_BATCH_SIZE and not _queue.empty():
+        entries.append(_queue.get_nowait())
+    return entries
+
+async def _flush_forever():
+    while True:
+        # Block for one entry, then take whatever else queued up behind it
+        entries = _drain(await _queue.get())
+        await _write_entries(entries)
+
+def start_audit_flusher():
+    """Called from the app lifespan; the queue must be created on the serving loop."""
+    global _queue, _flusher
+    if _flusher is None:
+        _queue = asyncio.Queue()
+        _flusher = asyncio.create_task(_flush_forever())
+
+async def stop_audit_flusher():
+    """Stops the flusher and commits anything still queued."""
+    global _flusher
+    if _flusher is None:
+        return
+    _flusher.cancel()
+    try:
+        await _flusher
+    except asyncio.CancelledError:
+        pass
+    _flusher = None
+    while not _queue.empty():
+        await _write_entries(_drain())
+
 async def log_activity(actor_email: str, actor_role: str, action: str, target_id: str, details: str = ""):
     """
     Logs an event to the 'audit_logs' collection in Firestore.
+    Queued for the background flusher when it's running; written directly otherwise (scripts, tests).
     """
-    try:
-        entry = {
-            "timestamp": datetime.utcnow(),
-            "actor_email": actor_email,
-            "actor_role": actor_role,
-            "action": action,
-            "target_id": target_id,
-            "details": details
-        }
-        db.collection("audit_logs").add(entry)
-    except Exception as e:
-
-        logger.error(f"Failed to write audit log: {e}")
\ No newline at end of file
+    entry = build_audit_entry(actor_email, actor_role, action, target_id, details)
+    if _flusher is not None:
+        _queue.put_nowait(entry)
+    else:
+        await _write_entries([entry])
@@ -0,0 +1,113 @@
+import threading
+import logging
+import time
+from typing import Dict, List, Optional
+from app.db.firestore import db
+
+logger = logging.getLogger("lumina.live_cache")
+
+# How long after one of our own writes readers skip the mirror: the listener
+# usually delivers within a second, and Firestore reads are always current.
+WRITE_GRACE_SECONDS = 5
+
+class CollectionMirror:
+    """
+    In-memory copy of a small collection, kept current by a Firestore snapshot listener.
+    Readers must check `ready` and fall back to Firestore while it's False: until the
+    first snapshot lands, just after the app writes to the collection, and after the
+    listener stops (the mirror then resubscribes and re-syncs).
+    """
+
+    def __init__(self, collection: str, unique_field: Optional[str] = None):
+        self.collection = collection
+        self.unique_field = unique_field
+        self._docs: Dict[str, dict] = {}
+        self._ids_by_field: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._watch = None
+        self._stale_until = 0.0
+        self._restarting = False
+
+    @property
+    def ready(self) -> bool:
+        if not self._ready.is_set() or time.monotonic() < self._stale_until:
+            return False
+        watch = self._watch
+        if watch is None or not watch.is_active:
+            # Stream closed or errored: the docs are frozen from here on
+            self._invalidate(f"Snapshot listener for {self.collection} stopped")
+            return False
+        return True
+
+    def mark_written(self):
+        """Called after the app writes to this collection, before caches refill from it."""
+        self._stale_until = time.monotonic() + WRITE_GRACE_SECONDS
+
+    def _invalidate(self, reason: str):
+        """Stops serving the docs and resubscribes; the fresh listener re-syncs everything."""
+        with self._lock:
+            self._ready.clear()
+            if self._restarting:
+                return
+            self._restarting = True
+        logger.warning("%s; resubscribing", reason)
+        # Off the caller's thread: unsubscribing joins the listener's thread
+        threading.Thread(target=self._resubscribe, daemon=True).start()
+
+    def _resubscribe(self):
+        try:
+            self.stop()
+            self.start()
+        finally:
+            self._restarting = False
+
+    def start(self):
+        if self._watch is None:
+            self._watch = db.collection(self.collection).on_snapshot(self._on_snapshot)
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+        self._ready.clear()
+        with self._lock:
+            self._docs.clear()
+            self._ids_by_field.clear()
+
+    def _on_snapshot(self, _snapshots, changes, _read_time):
+        # Runs on the listener's thread; the first call carries every doc as ADDED
+        try:
+            with self._lock:
+                for change in changes:
+                    doc_id = change.document.id
+                    previous = self._docs.pop(doc_id, None)
+                    if previous is not None and self.unique_field:
+                        old_value = previous.get(self.unique_field)
+                        if self._ids_by_field.get(old_value) == doc_id:
+                            del self._ids_by_field[old_value]
+                    if change.type.name != "REMOVED":
+                        data = change.document.to_dict()
+                        self._docs[doc_id] = data
+                        if self.unique_field and data.get(self.unique_field) is not None:
+                            self._ids_by_field[data[self.unique_field]] = doc_id
+            self._ready.set()
+        except Exception as e:
+            # A half-applied change set can't be trusted
+            self._invalidate(f"Mirror update failed for {self.collection}: {e}")
+
+    def snapshot(self) -> List[dict]:
+        """Current docs ordered by document ID. Shared dicts: read, don't mutate."""
+        with self._lock:
+            return [self._docs[doc_id] for doc_id in sorted(self._docs)]
+
+    def find(self, value) -> Optional[dict]:
+        """The doc whose `unique_field` equals value, without scanning. Shared dict: read, don't mutate."""
+        with self._lock:
+            doc_id = self._ids_by_field.get(value)
+            return self._docs.get(doc_id) if doc_id is not None else None
+
+# Tenants are keyed by tenant_id; the public demo route resolves them by slug
+tenant_mirror = CollectionMirror("tenants", unique_field="slug")
+user_mirror = CollectionMirror("users")
+MIRRORS = {m.collection: m for m in (tenant_mirror, user_mirror)}
@@ -1,24 +1,51 @@
-from datetime import datetime
+import asyncio
+from typing import List
+from cachetools import TTLCache
+from google.cloud import firestore
 from app.db.firestore import db
 import logging
 
 logger = logging.getLogger("lumina.notifications")
 
+# Firestore caps a WriteBatch at 500 writes
+WRITE_BATCH_LIMIT = 500
+
+# --- ADMIN LIST CACHE ---
+# Super-admin UIDs for notify_admins. Admin endpoints clear it whenever a
+# user is created or changes role.
+ADMIN_LIST_CACHE_TTL = 60
+_admin_list_cache = TTLCache(maxsize=1, ttl=ADMIN_LIST_CACHE_TTL)
+
+def invalidate_admin_list():
+    _admin_list_cache.clear()
+
+async def _super_admin_uids() -> List[str]:
+    uids = _admin_list_cache.get("super_admins")
+    if uids is None:
+        admins_query = db.collection("users").where("role", "==", "super_admin").select([])
+        uids = [admin.id for admin in await asyncio.to_thread(admins_query.get)]
+        _admin_list_cache["super_admins"] = uids
+    return uids
+
+def _build_notification(title: str, message: str, link: str, type: str) -> dict:
+    return {
+        "title": title,
+        "message": message,
+        "link": link,
+        "type": type, # info, success, warning, error
+        "is_read": False,
+        "timestamp": firestore.SERVER_TIMESTAMP
+    }
+
 async def send_in_app_notification(target_uid: str, title: str, message: str, link: str = "#", type: str = "info"):
     """
     Creates an in-app notification in Firestore for a specific user.
     """
     try:
-        notification = {
-            "title": title,
-            "message": message,
-            "link": link,
-            "type": type, # info, success, warning, error
-            "is_read": False,
-            "timestamp": datetime.utcnow()
-        }
+        notification = _build_notification(title, message, link, type)
         # Add to user's sub-collection
-        db.collection("users").document(target_uid).collection("notifications").add(notification)
+        notifications_ref = db.collection("users").document(target_uid).collection("notifications")
+        await asyncio.to_thread(notifications_ref.add, notification)
     except Exception as e:
         logger.error(f"Failed to send in-app notification to {target_uid}: {e}")
 
@@ -27,10 +54,19 @@ async def notify_admins(title: str, message: str, link: str):
     Sends a notification to ALL Super Admins.
     """
     try:
-        # Find all super admins
-        admins = db.collection("users").where("role", "==", "super_admin").stream()
-        for admin in admins:
-            await send_in_app_notification(admin.id, title, message, link, "warning")
+        # Fan out to every super admin in as few batch commits as possible
+        admin_uids = await _super_admin_uids()
+        if not admin_uids:
+            return
+        notification = _build_notification(title, message, link, "warning")
+        users_ref = db.collection("users")
+        batches = []
+        for start in range(0, len(admin_uids), WRITE_BATCH_LIMIT):
+            batch = db.batch()
+            for uid in admin_uids[start:start + WRITE_BATCH_LIMIT]:
+                batch.set(users_ref.document(uid).collection("notifications").document(), notification)
+            batches.append(batch)
+        await asyncio.gather(*[asyncio.to_thread(batch.commit) for batch in batches])
     except Exception as e:
         logger.error(f"Failed to notify admins: {e}")
 
@@ -39,7 +75,7 @@ async def notify_user_by_email(email: str, title: str, message: str, link: str):
     Finds a user by email and sends them a notification.
     """
     try:
-        users = db.collection("users").where("email", "==", email).limit(1).stream()
+        users = await asyncio.to_thread(db.collection("users").where("email", "==", email).select([]).limit(1).get)
         for user in users:
             await send_in_app_notification(user.id, title, message, link, "success")
     except Exception as e:
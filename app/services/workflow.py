@@ -1,5 +1,8 @@
-from datetime import datetime
-from typing import Dict, Any
+import asyncio
+import hashlib
+import orjson
+from google.cloud import firestore
+from typing import Dict, Any, Tuple
 from fastapi import HTTPException, status
 from app.db.firestore import db
 from app.models.tenant import ApprovalStatus
@@ -23,7 +26,7 @@ class WorkflowService:
         if not check_permission(user_role, Action.EDIT_DRAFT):
              raise HTTPException(status_code=403, detail="You do not have permission to edit drafts.")
 
-        doc_ref, _ = WorkflowService.get_tenant_doc(tenant_id)
+        doc_ref = db.collection("tenants").document(tenant_id)
         
         # 2. State Transition Logic
         # If a Super Admin edits, it can go straight to pending_super_admin if they want, 
@@ -37,47 +40,89 @@ class WorkflowService:
 
         update_data = {
             "pending_config": config_data,
+            "pending_hash": _config_hash(config_data),
             "approval_status": new_status,
             "last_modified_by": user_email,
-            "updated_at": datetime.utcnow()
+            "updated_at": firestore.SERVER_TIMESTAMP
         }
-        
-        doc_ref.update(update_data)
+
+        written = await asyncio.to_thread(_submit_in_transaction, db.transaction(), doc_ref, update_data)
+        if not written:
+            return {"status": "unchanged", "current_state": new_status}
         return {"status": "success", "current_state": new_status}
 
     @staticmethod
-    async def process_approval(tenant_id: str, user_role: str, user_email: str):
+    async def process_approval(tenant_id: str, user_role: str, user_email: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """
         Logic for moving the state forward (Approve).
+        The status check and the update commit in one transaction, so concurrent
+        approvers can't both pass the check. Returns (result, tenant as read).
         """
-        doc_ref, tenant = WorkflowService.get_tenant_doc(tenant_id)
-        current_status = tenant.get("approval_status")
-        pending_config = tenant.get("pending_config")
+        doc_ref = db.collection("tenants").document(tenant_id)
+        return await asyncio.to_thread(_approve_in_transaction, db.transaction(), doc_ref, user_role, user_email)
 
-        if not pending_config:
-            raise HTTPException(status_code=400, detail="No pending changes to approve")
+def _config_hash(config_data: Dict[str, Any]) -> str:
+    return hashlib.blake2b(orjson.dumps(config_data, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
 
-        # --- SCENARIO 1: PUBLISHING TO LIVE (Super Admin) ---
-        if check_permission(user_role, Action.PUBLISH_LIVE):
-            # Super Admin can force publish from ANY state
-            doc_ref.update({
-                "live_config": pending_config,
-                "pending_config": None, 
-                "approval_status": ApprovalStatus.PUBLISHED,
-                "last_modified_by": user_email,
-                "updated_at": datetime.utcnow()
-            })
-            return {"message": "Changes published LIVE."}
+# What a re-submission must match to be a no-op
+_SUBMISSION_KEYS = ("pending_hash", "approval_status", "last_modified_by")
 
-        # --- SCENARIO 2: APPROVING TO NEXT STAGE (Admin) ---
-        elif check_permission(user_role, Action.APPROVE_TO_SUPER):
-            if current_status != ApprovalStatus.PENDING_ADMIN:
-                 raise HTTPException(status_code=400, detail="Item is not waiting for Admin review.")
-            
-            doc_ref.update({
-                "approval_status": ApprovalStatus.PENDING_SUPER_ADMIN,
-                "last_modified_by": user_email
-            })
-            return {"message": "Approved. Sent to Super Admin."}
-        else:
-            raise HTTPException(status_code=403, detail="You do not have approval privileges.")
\ No newline at end of file
+@firestore.transactional
+def _submit_in_transaction(transaction, doc_ref, update_data: Dict[str, Any]) -> bool:
+    """
+    Writes the draft unless the stored one is identical (form re-posts, double clicks).
+    The check reads inside the transaction, so a concurrent publish or edit forces a retry
+    instead of a skipped write. Returns whether it wrote.
+    """
+    doc = doc_ref.get(field_paths=list(_SUBMISSION_KEYS), transaction=transaction)
+    if not doc.exists:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    current = doc.to_dict()
+    if all(current.get(key) == update_data[key] for key in _SUBMISSION_KEYS):
+        return False
+    transaction.update(doc_ref, update_data)
+    return True
+
+# Per-request fields (live_config, last_modified_by) are merged over these on publish
+_PUBLISH_FIELDS = {
+    "pending_config": None,
+    "pending_hash": None,
+    "approval_status": ApprovalStatus.PUBLISHED,
+    "updated_at": firestore.SERVER_TIMESTAMP
+}
+
+@firestore.transactional
+def _approve_in_transaction(transaction, doc_ref, user_role: str, user_email: str):
+    # Re-run by Firestore on contention; HTTPExceptions roll back and propagate
+    doc = doc_ref.get(transaction=transaction)
+    if not doc.exists:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    tenant = doc.to_dict()
+    current_status = tenant.get("approval_status")
+    pending_config = tenant.get("pending_config")
+
+    if not pending_config:
+        raise HTTPException(status_code=400, detail="No pending changes to approve")
+
+    # --- SCENARIO 1: PUBLISHING TO LIVE (Super Admin) ---
+    if check_permission(user_role, Action.PUBLISH_LIVE):
+        # Super Admin can force publish from ANY state
+        transaction.update(doc_ref, {
+            **_PUBLISH_FIELDS,
+            "live_config": pending_config,
+            "last_modified_by": user_email
+        })
+        return {"message": "Changes published LIVE."}, tenant
+
+    # --- SCENARIO 2: APPROVING TO NEXT STAGE (Admin) ---
+    elif check_permission(user_role, Action.APPROVE_TO_SUPER):
+        if current_status != ApprovalStatus.PENDING_ADMIN:
+             raise HTTPException(status_code=400, detail="Item is not waiting for Admin review.")
+        
+        transaction.update(doc_ref, {
+            "approval_status": ApprovalStatus.PENDING_SUPER_ADMIN,
+            "last_modified_by": user_email
+        })
+        return {"message": "Approved. Sent to Super Admin."}, tenant
+    else:
+        raise HTTPException(status_code=403, detail="You do not have approval privileges.")
@@ -1,5 +1,8 @@
 import os
 import uuid
+import functools
+from typing import Optional
+from google.api_core.exceptions import BadRequest
 from google.cloud import storage
 from dotenv import load_dotenv
 
@@ -8,32 +11,87 @@ load_dotenv()
 # Ensure this is set in your .env and Cloud Run variables
 BUCKET_NAME = os.getenv("GCP_STORAGE_BUCKET")
 
-def upload_file_to_gcs(file_obj, filename: str, content_type: str) -> str:
+# Banners and avatars are small; larger uploads are rejected before reaching GCS
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+
+class UploadTooLarge(ValueError):
+    """The file exceeds MAX_UPLOAD_BYTES; nothing was uploaded."""
+
+# Leading bytes of each image format we accept
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+IMAGE_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp"}
+
+def sniff_image_type(file_obj) -> Optional[str]:
+    """
+    Detects the image type from the file's first bytes rather than the client's
+    Content-Type header. Leaves the file positioned at the start.
+    """
+    head = file_obj.read(16)
+    file_obj.seek(0)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+# Cleared after the first upload if the bucket rejects per-object ACLs (UBLA)
+_object_acls_enabled = True
+
+@functools.lru_cache(maxsize=1)
+def _get_bucket() -> storage.Bucket:
+    """
+    One client (credentials, HTTP session, connection pool) per process.
+    In Cloud Run, this uses the default service account automatically.
+    Locally, it looks for GOOGLE_APPLICATION_CREDENTIALS.
+    """
+    return storage.Client().bucket(BUCKET_NAME)
+
+def upload_file_to_gcs(file_obj, folder: str, content_type: str, size: Optional[int] = None) -> str:
     """
     Uploads a file to Google Cloud Storage and returns the public URL.
+    The object key is generated ("<folder>/<hex uuid><ext>"); client filenames never reach it.
     """
     if not BUCKET_NAME:
         raise ValueError("GCP_STORAGE_BUCKET environment variable not set")
 
-    # Initialize GCS Client
-    # In Cloud Run, this uses the default service account automatically.
-    # Locally, it looks for GOOGLE_APPLICATION_CREDENTIALS.
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(BUCKET_NAME)
+    bucket = _get_bucket()
 
     # Generate a unique filename to prevent collisions
-    # e.g. "banners/a1b2c3d4-logo.png"
-    unique_name = f"banners/{uuid.uuid4()}-{filename}"
+    # e.g. "banners/a1b2c3d4e5f6....png"
+    unique_name = f"{folder}/{uuid.uuid4().hex}{IMAGE_EXTENSIONS.get(content_type, '')}"
     blob = bucket.blob(unique_name)
 
-    # Upload the file
-    blob.upload_from_file(file_obj, content_type=content_type)
+    # Upload the file. A known size lets the client send one multipart request
+    # instead of opening a resumable session; generation 0 means create-only.
+    if size is None:
+        # No Content-Length on the part: measure from the current position
+        start = file_obj.tell()
+        size = file_obj.seek(0, os.SEEK_END) - start
+        file_obj.seek(start)
+    if size > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"{size} bytes exceeds the {MAX_UPLOAD_BYTES} byte limit")
+    blob.upload_from_file(
+        file_obj, content_type=content_type, size=size,
+        if_generation_match=0, checksum="crc32c"
+    )
 
     # Attempt to make public (if bucket policy allows per-object ACLs)
-    try:
-        blob.make_public()
-    except Exception:
-        # If Uniform Bucket Level Access is on, the bucket itself must be public.
-        pass
+    global _object_acls_enabled
+    if _object_acls_enabled:
+        try:
+            blob.make_public()
+        except BadRequest:
+            # Uniform Bucket Level Access is on: the bucket itself must be public,
+            # and every later make_public() would fail the same way.
+            _object_acls_enabled = False
+        except Exception:
+            pass
 
     return blob.public_url
\ No newline at end of file
@@ -0,0 +1,31 @@
+import sys
+import os
+from datetime import datetime, timezone
+
+# Add the parent directory to the path so we can import our models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.firestore import db
+
+def backfill_access_request_timestamps():
+    """
+    Older access requests stored `timestamp` as an ISO string. Firestore orders strings
+    and Timestamps as separate groups, so convert them for the pending list's sort.
+    """
+    print("🔧 Converting string timestamps on access_requests...")
+
+    bulk_writer = db.bulk_writer()
+    updated = 0
+    for doc in db.collection("access_requests").select(["timestamp"]).stream():
+        value = doc.to_dict().get("timestamp")
+        if isinstance(value, str):
+            parsed = datetime.fromisoformat(value)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)  # written by utcnow()
+            bulk_writer.update(doc.reference, {"timestamp": parsed})
+            updated += 1
+    bulk_writer.close()
+    print(f"✅ access_requests: {updated} documents updated")
+
+if __name__ == "__main__":
+    backfill_access_request_timestamps()
@@ -0,0 +1,24 @@
+import sys
+import os
+
+# Add the parent directory to the path so we can import our models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.firestore import db
+
+def backfill_is_archived():
+    """Server-side `is_archived == False` filters skip documents without the field."""
+    print("🔧 Backfilling is_archived on tenants and users...")
+
+    bulk_writer = db.bulk_writer()
+    for collection in ("tenants", "users"):
+        updated = 0
+        for doc in db.collection(collection).select(["is_archived"]).stream():
+            if "is_archived" not in doc.to_dict():
+                bulk_writer.update(doc.reference, {"is_archived": False})
+                updated += 1
+        print(f"✅ {collection}: {updated} documents updated")
+    bulk_writer.close()
+
+if __name__ == "__main__":
+    backfill_is_archived()
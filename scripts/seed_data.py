@@ -1,6 +1,6 @@
 import sys
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 
 # Add the parent directory to the path so we can import our models
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -25,8 +25,9 @@ def seed_platform():
         role=UserRole.SUPER_ADMIN,
         assigned_tenants=["acme-corp-001"]
     )
-    user_ref.set(user_data.dict())
-    print(f"✅ Super Admin created: {admin_email}")
+    # Both docs go out in one batch commit: one round trip, all-or-nothing
+    batch = db.batch()
+    batch.set(user_ref, {**user_data.model_dump(), "is_archived": False})
 
     # 2. Create your First Tenant (Client)
     tenant_id = "acme-corp-001"
@@ -48,10 +49,12 @@ def seed_platform():
         live_config=initial_config,
         approval_status="published",
         last_modified_by=admin_email,
-        last_modified_at=datetime.utcnow().isoformat()
+        last_modified_at=datetime.now(timezone.utc).isoformat()
     )
     
-    tenant_ref.set(tenant_data.dict())
+    batch.set(tenant_ref, {**tenant_data.model_dump(), "is_archived": False})
+    batch.commit()
+    print(f"✅ Super Admin created: {admin_email}")
     print(f"✅ Initial Tenant created: {tenant_data.client_name} (URL: /acme-inc)")
 
 if __name__ == "__main__":